@@ -0,0 +1,51 @@
+"""
+Benchmarks rate quotes against a generated in-memory archive.
+
+  python bench_quotes.py [rows]
+"""
+import sys
+import time
+import random
+
+import main
+
+QUERIES = 1000
+
+def make_delivery():
+    weight = random.randint(2200, 7500)
+    length = round(random.uniform(12.5, 22.0), 1)
+    distance = random.randint(50, 3000)
+    # longer lanes are cheaper per mile, heavier vehicles dearer
+    dpm = 2.2 - distance / 3000 + (weight - 2200) / 10000 + random.uniform(-0.15, 0.15)
+    return {
+        "make_model_year": "Generated",
+        "weight": weight,
+        "length": length,
+        "distance": distance,
+        "dollar_per_mile": round(dpm, 2),
+    }
+
+def run(rows):
+    start = time.perf_counter()
+    index = main.build_quote_index(make_delivery() for _ in range(rows))
+    print(f"built index over {index.size} rows in {time.perf_counter() - start:.1f} s")
+    main._quote_index = index
+
+    queries = [make_delivery() for _ in range(QUERIES)]
+    samples = []
+    for q in queries:
+        t = time.perf_counter()
+        main.quote_rate(q["weight"], q["length"], q["distance"])
+        samples.append(time.perf_counter() - t)
+    samples.sort()
+    p50 = samples[len(samples) // 2] * 1000
+    p99 = samples[int(len(samples) * 0.99)] * 1000
+    print(f"cold quotes: p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+
+    t = time.perf_counter()
+    for q in queries:
+        main.quote_rate(q["weight"], q["length"], q["distance"])
+    print(f"cached quotes: {(time.perf_counter() - t) / QUERIES * 1000:.3f} ms each")
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
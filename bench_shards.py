@@ -0,0 +1,103 @@
+"""
+Benchmarks depot sharding on generated data in a temporary directory.
+Each depot gets the same number of drivers, so as depots are added the
+per-depot delivery write should stay flat, and so should the home page
+aggregation while depots <= SHARD_WORKERS. The concurrent column writes
+to every depot at once from one thread per depot; with per-depot locks
+those writes don't queue behind each other (beyond the GIL).
+
+  python bench_shards.py [drivers_per_depot] [vehicles_per_driver]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+import threading
+
+import main
+
+DEPOT_COUNTS = [1, 2, 4, 8, 16]
+ROUNDS = 20
+
+def make_driver(n, vehicles_per_driver):
+    return {
+        "name": f"Driver {n}",
+        "vehicle_capacity": vehicles_per_driver + 2,
+        "allowed_total_weight": 80000,
+        "allowed_cargo_weight": 50000,
+        "carrier_length_limit": 75,
+        "safe_distance": 1,
+        "vehicles": [
+            {
+                "make_model_year": "Toyota Camry 2020",
+                "weight": random.randint(2500, 6000),
+                "height": 5,
+                "length": random.randint(13, 19),
+                "distance": random.randint(100, 2500),
+                "dollar_per_mile": round(random.uniform(0.5, 2.0), 2),
+                "comment": "",
+            }
+            for _ in range(vehicles_per_driver)
+        ],
+    }
+
+def timed(func, rounds=ROUNDS):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000
+
+def shard_write(depot):
+    with main.shard_lock(depot):
+        drivers = main.load_drivers(depot)
+        main.save_drivers(drivers, depot)
+
+def concurrent_writes(count, rounds=ROUNDS):
+    """
+    Median ms per write while every depot is being written at once.
+    """
+    samples = []
+    samples_lock = threading.Lock()
+
+    def writer(depot):
+        mine = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            shard_write(depot)
+            mine.append(time.perf_counter() - start)
+        with samples_lock:
+            samples.extend(mine)
+
+    threads = [threading.Thread(target=writer, args=(f"depot{i}",)) for i in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    samples.sort()
+    return samples[len(samples) // 2] * 1000
+
+def run(drivers_per_depot, vehicles_per_driver):
+    print(f"{drivers_per_depot} drivers/depot, {vehicles_per_driver} vehicles/driver, median of {ROUNDS}")
+    print(f"{'depots':>6} {'drivers':>8} {'summary ms':>11} {'write ms':>9} {'concurrent ms':>14}")
+    for count in DEPOT_COUNTS:
+        for i in range(count):
+            depot = f"depot{i}"
+            if depot in main.list_depots():
+                continue
+            main.save_drivers([make_driver(n, vehicles_per_driver) for n in range(drivers_per_depot)], depot)
+        main.fleet_summary()  # warm up the process pool
+        summary_ms = timed(main.fleet_summary)
+        write_ms = timed(lambda: shard_write("depot0"))
+        concurrent_ms = concurrent_writes(count)
+        print(f"{count:>6} {count * drivers_per_depot:>8} {summary_ms:>11.1f} {write_ms:>9.1f} {concurrent_ms:>14.1f}")
+
+if __name__ == "__main__":
+    drivers_per_depot = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    vehicles_per_driver = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        run(drivers_per_depot, vehicles_per_driver)
@@ -1,13 +1,47 @@
 import os
+import csv
 import json
+import math
+import time
 import uuid
-from datetime import datetime
-from flask import Flask, request, redirect
+import heapq
+import functools
+import atexit
+import threading
+import multiprocessing
+from array import array
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import datetime, timedelta
+from flask import Flask, request, redirect, jsonify, send_file
 from bs4 import BeautifulSoup
+from markupsafe import escape
 
+# Pre-sharding single-file layout, only read by the legacy import.
 DRIVERS_FILE = "data/drivers.json"
 ARCHIVED_FILE = "data/archived_vehicles.json"
 
+# Each depot is a shard: data/depots/<depot>/{drivers,archived_vehicles}.json
+DEPOTS_DIR = "data/depots"
+DEFAULT_DEPOT = "main"
+SHARD_WORKERS = min(8, os.cpu_count() or 1)
+
+# Rate quotes: a grid cell is one unit of each scale. Distances between
+# deliveries are measured in these units.
+QUOTE_SCALES = {"weight": 250.0, "length": 0.5, "distance": 50.0}
+QUOTE_DEFAULT_K = 10
+QUOTE_CACHE_SIZE = 1024
+JOBS_FILE = "data/jobs.json"
+EXPORTS_DIR = "data/exports"
+
+# Background jobs: at most JOB_WORKERS run at once, and at most
+# JOB_QUEUE_LIMIT may be waiting before new submissions are refused.
+JOB_WORKERS = 2
+JOB_QUEUE_LIMIT = 20
+# Finished jobs kept in jobs.json; older ones are dropped with their files.
+JOB_HISTORY_LIMIT = 50
+# Progress is written to jobs.json at most this often.
+JOB_PROGRESS_INTERVAL = 1.0
+
 app = Flask(__name__)
 
 # ---------------------------------------------------------------------
@@ -23,27 +57,1030 @@ def load_json(filepath):
         return []
 
 def save_json(filepath, data):
-    with open(filepath, "w") as f:
+    # write to a temp file and swap it in, so readers in other threads or
+    # processes never see a truncated file
+    tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
         json.dump(data, f, indent=4)
+    os.replace(tmp_path, filepath)
+
+# ---------------------------------------------------------------------
+# DEPOT SHARDS
+# ---------------------------------------------------------------------
+_shard_locks = {}
+_shard_locks_guard = threading.Lock()
+
+def valid_depot_name(depot):
+    return bool(depot) and all(c.isalnum() or c in "-_" for c in depot)
+
+def depot_dir(depot):
+    if not valid_depot_name(depot):
+        raise ValueError(f"Invalid depot name: {depot!r}")
+    return os.path.join(DEPOTS_DIR, depot)
+
+def shard_lock(depot):
+    """
+    One lock per depot, so a write to one shard never waits on another.
+    Hold it around any load -> modify -> save of that depot's files.
+    """
+    with _shard_locks_guard:
+        if depot not in _shard_locks:
+            _shard_locks[depot] = threading.RLock()
+        return _shard_locks[depot]
+
+def list_depots():
+    if not os.path.isdir(DEPOTS_DIR):
+        return []
+    return sorted(
+        name for name in os.listdir(DEPOTS_DIR)
+        if valid_depot_name(name) and os.path.isdir(os.path.join(DEPOTS_DIR, name))
+    )
+
+def ensure_depot(depot):
+    path = depot_dir(depot)
+    os.makedirs(path, exist_ok=True)
+    for name in ("drivers.json", "archived_vehicles.json"):
+        filepath = os.path.join(path, name)
+        if not os.path.exists(filepath):
+            with open(filepath, "w") as f:
+                f.write("[]")
+
+def load_drivers(depot=DEFAULT_DEPOT):
+    return load_json(os.path.join(depot_dir(depot), "drivers.json"))
+
+def save_drivers(drivers, depot=DEFAULT_DEPOT):
+    ensure_depot(depot)
+    save_json(os.path.join(depot_dir(depot), "drivers.json"), drivers)
+    record_utilization(drivers, depot)
+
+def load_archived(depot=DEFAULT_DEPOT):
+    return load_json(os.path.join(depot_dir(depot), "archived_vehicles.json"))
+
+def save_archived(archived, depot=DEFAULT_DEPOT):
+    ensure_depot(depot)
+    save_json(os.path.join(depot_dir(depot), "archived_vehicles.json"), archived)
+
+def load_all_archived():
+    """
+    Archived vehicles from every depot, each tagged with its depot.
+    """
+    result = []
+    for depot in list_depots():
+        for v in load_archived(depot):
+            v.setdefault("depot", depot)
+            result.append(v)
+    return result
+
+def migrate_legacy_files():
+    """
+    Moves the old single drivers.json / archived_vehicles.json into depot
+    shards (by each driver's "depot" field, else DEFAULT_DEPOT) and
+    empties them. Returns the number of drivers moved.
+    """
+    drivers = load_json(DRIVERS_FILE)
+    archived = load_json(ARCHIVED_FILE)
+    if not drivers and not archived:
+        return 0
+    by_depot = {}
+    for d in drivers:
+        depot = d.get("depot") or DEFAULT_DEPOT
+        d["depot"] = depot
+        by_depot.setdefault(depot, []).append(d)
+    for depot, moved in by_depot.items():
+        with shard_lock(depot):
+            save_drivers(load_drivers(depot) + moved, depot)
+    if archived:
+        with shard_lock(DEFAULT_DEPOT):
+            save_archived(load_archived(DEFAULT_DEPOT) + archived, DEFAULT_DEPOT)
+    save_json(DRIVERS_FILE, [])
+    save_json(ARCHIVED_FILE, [])
+    return len(drivers)
+
+def move_driver(name, src_depot, dst_depot):
+    """
+    Moves a driver, and the archived vehicles they delivered, from one
+    depot shard to another. Returns False if no such driver.
+    """
+    if src_depot == dst_depot:
+        return False
+    # always lock in name order so two opposite moves cannot deadlock
+    first, second = sorted([src_depot, dst_depot])
+    with shard_lock(first), shard_lock(second):
+        src_drivers = load_drivers(src_depot)
+        moving = [d for d in src_drivers if d["name"] == name]
+        if not moving:
+            return False
+        for d in moving:
+            d["depot"] = dst_depot
+        src_arch = load_archived(src_depot)
+        moving_arch = [v for v in src_arch if v.get("driver") == name]
+        for v in moving_arch:
+            v["depot"] = dst_depot
+        move_utilization(name, src_depot, dst_depot)
+
+        save_drivers(load_drivers(dst_depot) + moving, dst_depot)
+        save_archived(load_archived(dst_depot) + moving_arch, dst_depot)
+        save_drivers([d for d in src_drivers if d["name"] != name], src_depot)
+        save_archived([v for v in src_arch if v.get("driver") != name], src_depot)
+    return True
+
+def apply_depot_assignments():
+    """
+    Applies hand-edited "depot" fields: moves every driver whose field
+    names a different shard than the one it is stored in.
+    Returns (moves, rejected), both lists of (name, from, to); rejected
+    ones name a depot that isn't a valid depot name and are left alone.
+    """
+    moves, rejected = [], []
+    for depot in list_depots():
+        for d in load_drivers(depot):
+            target = d.get("depot") or depot
+            if target == depot:
+                continue
+            if valid_depot_name(target):
+                moves.append((d["name"], depot, target))
+            else:
+                rejected.append((d["name"], depot, target))
+    for name, src_depot, dst_depot in moves:
+        ensure_depot(dst_depot)
+        move_driver(name, src_depot, dst_depot)
+    return moves, rejected
+
+# ---------------------------------------------------------------------
+# CROSS-SHARD AGGREGATION
+# ---------------------------------------------------------------------
+_shard_pool = None
+_shard_pool_lock = threading.Lock()
 
-def load_drivers():
-    return load_json(DRIVERS_FILE)
+def get_shard_pool():
+    """
+    Workers come from a forkserver rather than forking this process,
+    which has server and job threads running.
+    """
+    global _shard_pool
+    with _shard_pool_lock:
+        if _shard_pool is None:
+            _shard_pool = ProcessPoolExecutor(
+                max_workers=SHARD_WORKERS,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+        return _shard_pool
+
+def shard_summary(depot):
+    """
+    Per-driver rows and totals for one depot. Runs in a worker process,
+    so it only reads the shard files and returns plain data.
+    """
+    drivers = load_drivers(depot)
+    rows = []
+    for i, d in enumerate(drivers):
+        loaded = len(d["vehicles"])
 
-def save_drivers(drivers):
-    save_json(DRIVERS_FILE, drivers)
+        # Remaining Weight
+        current_weight = sum(v["weight"] for v in d["vehicles"])
+        rem_wt = d["allowed_cargo_weight"] - current_weight
+
+        # Sum($/mi)
+        total_dollar_mi = sum(v.get("dollar_per_mile", 0.0) for v in d["vehicles"])
+
+        # Remaining Length
+        used_length = sum(v["length"] for v in d["vehicles"]) + (loaded * d["safe_distance"])
+        rem_len = d["carrier_length_limit"] - used_length
+        if rem_len < 0:
+            rem_len = 0
+
+        rows.append({
+            "depot": depot,
+            "index": i,
+            "name": d["name"],
+            "loaded": loaded,
+            "capacity": d["vehicle_capacity"],
+            "rem_wt": rem_wt,
+            "dollar_per_mile": total_dollar_mi,
+            "rem_len": rem_len,
+        })
+    return {
+        "depot": depot,
+        "drivers": rows,
+        "totals": {
+            "drivers": len(rows),
+            "vehicles": sum(r["loaded"] for r in rows),
+            "capacity": sum(r["capacity"] for r in rows),
+            "dollar_per_mile": sum(r["dollar_per_mile"] for r in rows),
+            "archived": len(load_archived(depot)),
+        },
+    }
+
+def fleet_summary():
+    """
+    Summarises every depot in parallel and merges the results into
+    {"depots": [...], "totals": {...}}.
+    """
+    depots = list_depots()
+    if len(depots) > 1 and SHARD_WORKERS > 1:
+        summaries = list(get_shard_pool().map(shard_summary, depots))
+    else:
+        summaries = [shard_summary(depot) for depot in depots]
+    totals = {"depots": len(summaries), "drivers": 0, "vehicles": 0,
+              "capacity": 0, "dollar_per_mile": 0.0, "archived": 0}
+    for s in summaries:
+        for key, value in s["totals"].items():
+            totals[key] += value
+    return {"depots": summaries, "totals": totals}
+
+# ---------------------------------------------------------------------
+# BACKGROUND JOBS
+# ---------------------------------------------------------------------
+class JobCancelled(Exception):
+    pass
+
+class JobQueueFull(Exception):
+    pass
+
+_job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+# System jobs (index builds) get their own thread and skip the queue limit,
+# so a backlog of user jobs can't hold them up.
+_system_job_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="system-job")
+_system_job_ids = set()
+_jobs_lock = threading.Lock()
+_job_futures = {}
+_job_cancel_flags = {}
+job_metrics = {
+    "submitted": 0,
+    "finished": 0,
+    "failed": 0,
+    "cancelled": 0,
+    "rejected": 0,
+    "queue_depth": 0,
+    "max_queue_depth": 0,
+    "running": 0,
+    "total_exec_seconds": 0.0,
+    "max_exec_seconds": 0.0,
+}
+
+def load_jobs():
+    jobs = load_json(JOBS_FILE)
+    return jobs if isinstance(jobs, dict) else {}
+
+def save_jobs(jobs):
+    save_json(JOBS_FILE, jobs)
+
+def _update_job(job_id, **fields):
+    with _jobs_lock:
+        jobs = load_jobs()
+        job = jobs.get(job_id)
+        if job is None:
+            return None
+        job.update(fields)
+        save_jobs(jobs)
+        return job
+
+def get_job(job_id):
+    with _jobs_lock:
+        return load_jobs().get(job_id)
+
+class JobContext:
+    """
+    Handed to every job function so it can report progress and
+    notice when someone has asked for it to stop.
+    """
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._last_progress_save = 0.0
+
+    def cancelled(self):
+        flag = _job_cancel_flags.get(self.job_id)
+        return flag is not None and flag.is_set()
+
+    def progress(self, done, total):
+        if self.cancelled():
+            raise JobCancelled()
+        now = time.monotonic()
+        if now - self._last_progress_save < JOB_PROGRESS_INTERVAL:
+            return
+        self._last_progress_save = now
+        pct = 100.0 if total <= 0 else round(100.0 * done / total, 1)
+        _update_job(self.job_id, progress=pct)
+
+    def output_file(self, path):
+        """
+        Records a file the job is about to write, so it can be cleaned
+        up even if the server stops before the job finishes.
+        """
+        _update_job(self.job_id, output_file=path)
+
+def _run_job(job_id, func, args):
+    with _jobs_lock:
+        if job_id not in _system_job_ids:
+            job_metrics["queue_depth"] -= 1
+        job_metrics["running"] += 1
+    ctx = JobContext(job_id)
+    started = time.monotonic()
+    _update_job(job_id, status="running", started_at=datetime.now().isoformat())
+    status, result, error = "finished", None, None
+    try:
+        if ctx.cancelled():
+            raise JobCancelled()
+        result = func(ctx, *args)
+    except JobCancelled:
+        status = "cancelled"
+    except Exception as e:
+        status, error = "failed", str(e)
+    elapsed = time.monotonic() - started
+
+    with _jobs_lock:
+        job_metrics["running"] -= 1
+        job_metrics[status] += 1
+        job_metrics["total_exec_seconds"] += elapsed
+        job_metrics["max_exec_seconds"] = max(job_metrics["max_exec_seconds"], elapsed)
+        _job_futures.pop(job_id, None)
+        _job_cancel_flags.pop(job_id, None)
+        _system_job_ids.discard(job_id)
+
+    fields = dict(status=status, finished_at=datetime.now().isoformat(),
+                  exec_seconds=round(elapsed, 3), result=result, error=error)
+    if status == "finished":
+        fields["progress"] = 100.0
+    _update_job(job_id, **fields)
+    prune_jobs()
+
+def _remove_job_files(job):
+    result = job.get("result") or {}
+    for path in {job.get("output_file"), result.get("file")}:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+def prune_jobs():
+    """
+    Keeps the newest JOB_HISTORY_LIMIT finished jobs and deletes the
+    rest, along with any file they produced.
+    """
+    with _jobs_lock:
+        jobs = load_jobs()
+        done = sorted(
+            (j for j in jobs.values() if j["status"] not in ("queued", "running")),
+            key=lambda j: j["created_at"], reverse=True,
+        )
+        expired = done[JOB_HISTORY_LIMIT:]
+        if not expired:
+            return
+        for job in expired:
+            _remove_job_files(job)
+            del jobs[job["id"]]
+        save_jobs(jobs)
+
+def submit_job(kind, func, *args, system=False):
+    """
+    Queue func(ctx, *args) on the job pool and return the new job id
+    straight away. Raises JobQueueFull if too many jobs are waiting.
+    With system=True the job runs on the system thread instead and is
+    never refused.
+    """
+    job_id = str(uuid.uuid4())
+    with _jobs_lock:
+        if not system and job_metrics["queue_depth"] >= JOB_QUEUE_LIMIT:
+            job_metrics["rejected"] += 1
+            raise JobQueueFull()
+        jobs = load_jobs()
+        jobs[job_id] = {
+            "id": job_id,
+            "kind": kind,
+            "status": "queued",
+            "progress": 0.0,
+            "created_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "exec_seconds": None,
+            "output_file": None,
+            "result": None,
+            "error": None,
+        }
+        save_jobs(jobs)
+        job_metrics["submitted"] += 1
+        _job_cancel_flags[job_id] = threading.Event()
+        if system:
+            _system_job_ids.add(job_id)
+            _job_futures[job_id] = _system_job_executor.submit(_run_job, job_id, func, args)
+        else:
+            job_metrics["queue_depth"] += 1
+            job_metrics["max_queue_depth"] = max(job_metrics["max_queue_depth"], job_metrics["queue_depth"])
+            _job_futures[job_id] = _job_executor.submit(_run_job, job_id, func, args)
+    return job_id
+
+def cancel_job(job_id):
+    """
+    Queued jobs are dropped before they start; running jobs stop at
+    their next progress() call. Returns False if the job is already done.
+    """
+    with _jobs_lock:
+        flag = _job_cancel_flags.get(job_id)
+        future = _job_futures.get(job_id)
+        if flag is None:
+            return False
+        flag.set()
+        dropped = future is not None and future.cancel()
+        if dropped:
+            if job_id in _system_job_ids:
+                _system_job_ids.discard(job_id)
+            else:
+                job_metrics["queue_depth"] -= 1
+            job_metrics["cancelled"] += 1
+            _job_futures.pop(job_id, None)
+            _job_cancel_flags.pop(job_id, None)
+    if dropped:
+        _update_job(job_id, status="cancelled", finished_at=datetime.now().isoformat())
+    return True
+
+def mark_interrupted_jobs():
+    """
+    Jobs only live in this process, so anything still queued or running
+    from a previous run will never finish. Their half-written files go.
+    """
+    with _jobs_lock:
+        jobs = load_jobs()
+        for job in jobs.values():
+            if job["status"] in ("queued", "running"):
+                _remove_job_files(job)
+                job["status"] = "failed"
+                job["error"] = "Interrupted by server restart"
+        save_jobs(jobs)
+    prune_jobs()
+
+# ---------------------------------------------------------------------
+# UTILIZATION TIME-SERIES
+# ---------------------------------------------------------------------
+# (name, bucket seconds, samples kept). "raw" keeps every sample; the
+# coarser tiers average all samples falling in the same bucket.
+UTILIZATION_TIERS = [
+    ("raw", 0, 240),
+    ("1m", 60, 240),
+    ("1h", 3600, 168),
+    ("1d", 86400, 365),
+]
+UTILIZATION_METRICS = ["slots", "weight", "length"]
+# History is snapshotted to data/depots/<depot>/utilization.json at most
+# this often, and once more when the app exits.
+UTILIZATION_SAVE_INTERVAL = 300
+
+class RingBuffer:
+    """
+    Fixed-size (timestamp, value) buffer backed by two arrays.
+    Once full, each new sample overwrites the oldest one.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.times = array("d", [0.0] * size)
+        self.values = array("d", [0.0] * size)
+        self.start = 0
+        self.count = 0
+
+    def append(self, ts, value):
+        pos = (self.start + self.count) % self.size
+        self.times[pos] = ts
+        self.values[pos] = value
+        if self.count < self.size:
+            self.count += 1
+        else:
+            self.start = (self.start + 1) % self.size
+
+    def items(self):
+        return [
+            (self.times[(self.start + i) % self.size], self.values[(self.start + i) % self.size])
+            for i in range(self.count)
+        ]
+
+    def extend(self, items):
+        for ts, value in items:
+            self.append(ts, value)
+
+class DownsampledSeries:
+    """
+    One ring buffer per tier. Coarser tiers accumulate the samples of
+    the current bucket and push their average once the bucket closes.
+    """
+    def __init__(self):
+        self.buffers = {name: RingBuffer(size) for name, _, size in UTILIZATION_TIERS}
+        # tier name -> [bucket index, sum, count]
+        self.pending = {name: None for name, step, _ in UTILIZATION_TIERS if step}
+
+    def add(self, ts, value):
+        # Samples are taken per mutation, so a bucket's average is weighted
+        # by how many mutations fell in it, not by how long each value held.
+        for name, step, _ in UTILIZATION_TIERS:
+            if not step:
+                self.buffers[name].append(ts, value)
+                continue
+            bucket = int(ts // step)
+            acc = self.pending[name]
+            if acc is not None and acc[0] != bucket:
+                self.buffers[name].append(acc[0] * step, acc[1] / acc[2])
+                acc = None
+            if acc is None:
+                acc = [bucket, 0.0, 0]
+            acc[1] += value
+            acc[2] += 1
+            self.pending[name] = acc
+
+    def points(self, tier):
+        pts = self.buffers[tier].items()
+        step = dict((name, step) for name, step, _ in UTILIZATION_TIERS)[tier]
+        acc = self.pending.get(tier)
+        if acc is not None:
+            # include the still-open bucket so recent activity shows up
+            pts.append((acc[0] * step, acc[1] / acc[2]))
+        return pts
+
+    def to_dict(self):
+        return {
+            "buffers": {
+                name: [[round(t, 3), round(v, 4)] for t, v in buf.items()]
+                for name, buf in self.buffers.items()
+            },
+            "pending": self.pending,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        series = cls()
+        for name, items in data.get("buffers", {}).items():
+            if name in series.buffers:
+                series.buffers[name].extend(items)
+        for name, acc in data.get("pending", {}).items():
+            if name in series.pending:
+                series.pending[name] = acc
+        return series
+
+# One lock per depot, like the shard locks, so sampling one depot never
+# waits on another.
+_utilization_locks = {}
+_utilization_locks_guard = threading.Lock()
+# depot -> driver name -> metric -> DownsampledSeries
+_utilization = {}
+# depot -> time.monotonic() of its last snapshot
+_utilization_saved_at = {}
+
+def utilization_lock(depot):
+    with _utilization_locks_guard:
+        if depot not in _utilization_locks:
+            _utilization_locks[depot] = threading.Lock()
+        return _utilization_locks[depot]
+
+def _utilization_file(depot):
+    return os.path.join(depot_dir(depot), "utilization.json")
+
+def _depot_series(depot):
+    """
+    The depot's series, loaded from its snapshot the first time it is
+    used. Call with utilization_lock(depot) held.
+    """
+    if depot not in _utilization:
+        saved = load_json(_utilization_file(depot))
+        _utilization[depot] = {
+            name: {m: DownsampledSeries.from_dict(data.get(m, {})) for m in UTILIZATION_METRICS}
+            for name, data in (saved.items() if isinstance(saved, dict) else [])
+        }
+        _utilization_saved_at[depot] = time.monotonic()
+    return _utilization[depot]
+
+def save_utilization(depot):
+    with utilization_lock(depot):
+        if depot not in _utilization:
+            return
+        snapshot = {
+            name: {m: s.to_dict() for m, s in series.items()}
+            for name, series in _utilization[depot].items()
+        }
+        _utilization_saved_at[depot] = time.monotonic()
+    # the depot may have been removed since it was loaded
+    if os.path.isdir(depot_dir(depot)):
+        save_json(_utilization_file(depot), snapshot)
+
+@atexit.register
+def save_all_utilization():
+    for depot in list(_utilization):
+        save_utilization(depot)
+
+def driver_utilization(d):
+    """
+    Fractions (0..1, may exceed 1 if overloaded) of slots, cargo weight
+    and carrier length currently used by the driver's vehicles.
+    """
+    loaded = len(d["vehicles"])
+    weight = sum(v["weight"] for v in d["vehicles"])
+    length = sum(v["length"] for v in d["vehicles"]) + (loaded * d["safe_distance"])
+    def ratio(used, limit):
+        return used / limit if limit else 0.0
+    return {
+        "slots": ratio(loaded, d["vehicle_capacity"]),
+        "weight": ratio(weight, d["allowed_cargo_weight"]),
+        "length": ratio(length, d["carrier_length_limit"]),
+    }
+
+def record_utilization(drivers, depot=DEFAULT_DEPOT, ts=None):
+    """
+    Samples every driver of a depot. Series of drivers no longer in the
+    depot (deleted or renamed) are dropped so memory stays bounded.
+    """
+    ts = time.time() if ts is None else ts
+    with utilization_lock(depot):
+        depot_series = _depot_series(depot)
+        current = {d["name"] for d in drivers}
+        for name in [n for n in depot_series if n not in current]:
+            del depot_series[name]
+        for d in drivers:
+            series = depot_series.get(d["name"])
+            if series is None:
+                series = depot_series[d["name"]] = {m: DownsampledSeries() for m in UTILIZATION_METRICS}
+            for metric, value in driver_utilization(d).items():
+                series[metric].add(ts, value)
+        due = time.monotonic() - _utilization_saved_at[depot] >= UTILIZATION_SAVE_INTERVAL
+    if due:
+        save_utilization(depot)
+
+def move_utilization(name, src_depot, dst_depot):
+    """
+    Carries a driver's history over when they move to another depot.
+    """
+    first, second = sorted([src_depot, dst_depot])
+    with utilization_lock(first), utilization_lock(second):
+        series = _depot_series(src_depot).pop(name, None)
+        if series is not None:
+            _depot_series(dst_depot)[name] = series
+
+def utilization_points(name, depot=DEFAULT_DEPOT, tier="raw"):
+    """
+    {metric: [[timestamp, value], ...]} for the given tier, oldest first.
+    """
+    with utilization_lock(depot):
+        series = _depot_series(depot).get(name)
+        if series is None:
+            return {m: [] for m in UTILIZATION_METRICS}
+        return {
+            m: [[t, round(v, 4)] for t, v in series[m].points(tier)]
+            for m in UTILIZATION_METRICS
+        }
+
+SPARKLINE_COLORS = {"slots": "#007bff", "weight": "#28a745", "length": "#fd7e14"}
+
+def build_sparkline(soup, points, width=120, height=28):
+    """
+    Small inline SVG with one polyline per metric. Values are clamped to
+    0..1 so an overloaded carrier just sits on the top edge.
+    """
+    svg = soup.new_tag("svg", width=str(width), height=str(height),
+                       viewBox=f"0 0 {width} {height}", **{"class": "sparkline"})
+    for metric, pts in points.items():
+        if not pts:
+            continue
+        if len(pts) == 1:
+            pts = [pts[0], pts[0]]
+        t0, t1 = pts[0][0], pts[-1][0]
+        span = (t1 - t0) or 1.0
+        coords = []
+        for i, (t, v) in enumerate(pts):
+            x = (t - t0) / span * width if t1 != t0 else i / (len(pts) - 1) * width
+            y = height - min(max(v, 0.0), 1.0) * (height - 2) - 1
+            coords.append(f"{round(x,1)},{round(y,1)}")
+        line = soup.new_tag("polyline", points=" ".join(coords), fill="none",
+                            stroke=SPARKLINE_COLORS[metric], **{"stroke-width": "1.5"})
+        title = soup.new_tag("title")
+        title.string = f"{metric}: {round(pts[-1][1] * 100)}%"
+        line.append(title)
+        svg.append(line)
+    return svg
+
+# ---------------------------------------------------------------------
+# RATE QUOTES
+# ---------------------------------------------------------------------
+def quote_point(weight, length, distance):
+    return (
+        weight / QUOTE_SCALES["weight"],
+        length / QUOTE_SCALES["length"],
+        distance / QUOTE_SCALES["distance"],
+    )
+
+class QuoteIndexWarmingUp(Exception):
+    pass
+
+class QuoteIndex:
+    """
+    Archived deliveries bucketed into a grid over normalized weight,
+    length and distance. Nearest-neighbour search walks outwards ring by
+    ring from the query's cell, so it only looks at nearby buckets.
+
+    Rows are stored column-wise in arrays and each cell only holds row
+    numbers; summaries are built just for the rows a search returns.
+    add() only ever appends, so searches run without a lock and at worst
+    miss a delivery added while they were running.
+    """
+    def __init__(self):
+        # cell -> array of row numbers
+        self.cells = {}
+        self.weights = array("d")
+        self.lengths = array("d")
+        self.distances = array("d")
+        self.rates = array("d")
+        # row -> position in model_names / depot_names
+        self.models = array("l")
+        self.depots = array("l")
+        self.model_names = []
+        self.depot_names = []
+        self._model_ids = {}
+        self._depot_ids = {}
+        self.size = 0
+        # bumped on every add so cached quotes from before are not reused
+        self.version = 0
+        # (lowest cell, highest cell) holding any delivery
+        self.bounds = None
+
+    @staticmethod
+    def _name_id(names, ids, name):
+        if name not in ids:
+            ids[name] = len(names)
+            names.append(name)
+        return ids[name]
+
+    def add(self, v):
+        try:
+            weight, length, distance = float(v["weight"]), float(v["length"]), float(v["distance"])
+            dpm = float(v["dollar_per_mile"])
+        except (KeyError, TypeError, ValueError):
+            return False
+        point = quote_point(weight, length, distance)
+        if not all(math.isfinite(c) for c in point + (dpm,)):
+            return False
+        cell = tuple(math.floor(c) for c in point)
+
+        row = self.size
+        self.weights.append(weight)
+        self.lengths.append(length)
+        self.distances.append(distance)
+        self.rates.append(dpm)
+        self.models.append(self._name_id(self.model_names, self._model_ids, str(v.get("make_model_year", ""))))
+        self.depots.append(self._name_id(self.depot_names, self._depot_ids, str(v.get("depot", ""))))
+        rows = self.cells.get(cell)
+        if rows is None:
+            self.cells[cell] = array("l", [row])
+        else:
+            rows.append(row)
+
+        if self.bounds is None:
+            self.bounds = (cell, cell)
+        else:
+            lo, hi = self.bounds
+            self.bounds = (
+                tuple(min(a, b) for a, b in zip(lo, cell)),
+                tuple(max(a, b) for a, b in zip(hi, cell)),
+            )
+        self.size += 1
+        self.version += 1
+        return True
+
+    def point(self, row):
+        return quote_point(self.weights[row], self.lengths[row], self.distances[row])
+
+    def summary(self, row):
+        def num(x):
+            return int(x) if x.is_integer() else x
+        return {
+            "make_model_year": self.model_names[self.models[row]],
+            "weight": num(self.weights[row]),
+            "length": num(self.lengths[row]),
+            "distance": num(self.distances[row]),
+            "dollar_per_mile": self.rates[row],
+            "depot": self.depot_names[self.depots[row]],
+        }
+
+    def _ring(self, center, r, lo, hi):
+        """
+        Cells at Chebyshev distance r from center, clipped to lo..hi.
+        """
+        cx, cy, cz = center
+        for x in range(max(cx - r, lo[0]), min(cx + r, hi[0]) + 1):
+            for y in range(max(cy - r, lo[1]), min(cy + r, hi[1]) + 1):
+                if abs(x - cx) == r or abs(y - cy) == r:
+                    zs = range(max(cz - r, lo[2]), min(cz + r, hi[2]) + 1)
+                else:
+                    zs = [z for z in (cz - r, cz + r) if lo[2] <= z <= hi[2]]
+                for z in zs:
+                    yield (x, y, z)
+
+    def nearest(self, point, k):
+        """
+        [(distance, summary), ...] for the k closest deliveries, nearest first.
+
+        A query outside the range of the archive is ranked from the nearest
+        point inside it (e.g. a 4000 mi lane against deliveries of at most
+        3000 mi is compared with the longest lanes), so the search stays
+        local. Reported distances are still from the query itself.
+        """
+        cells = self.cells
+        bounds = self.bounds
+        if bounds is None:
+            return []
+        lo, hi = bounds
+
+        query = point
+        point = tuple(min(max(c, l), h + 1) for c, l, h in zip(point, lo, hi))
+        center = tuple(min(math.floor(c), h) for c, h in zip(point, hi))
+        max_r = max(max(c - l, h - c) for c, l, h in zip(center, lo, hi))
+
+        best = []  # max-heap of (-dist, row)
+        weights, lengths, distances = self.weights, self.lengths, self.distances
+        sw, sl, sd = (1.0 / QUOTE_SCALES[f] for f in ("weight", "length", "distance"))
+        qw, ql, qd = point
+
+        def consider(rows):
+            for row in rows:
+                d = math.sqrt(
+                    (weights[row] * sw - qw) ** 2
+                    + (lengths[row] * sl - ql) ** 2
+                    + (distances[row] * sd - qd) ** 2
+                )
+                if len(best) < k:
+                    heapq.heappush(best, (-d, row))
+                elif d < -best[0][0]:
+                    heapq.heapreplace(best, (-d, row))
+
+        def cell_gap2(cell):
+            return sum(max(c - q, 0, q - c - 1) ** 2 for c, q in zip(cell, point))
+
+        r = 0
+        while r <= max_r:
+            if (2 * r + 1) ** 3 > len(cells):
+                # the ring is bigger than the whole index: visit the cells
+                # left over, closest first, until none can beat the k-th
+                rest = sorted(
+                    (cell_gap2(cell), cell) for cell in list(cells)
+                    if max(abs(a - b) for a, b in zip(cell, center)) >= r
+                )
+                for gap2, cell in rest:
+                    if len(best) == k and gap2 >= best[0][0] ** 2:
+                        break
+                    consider(cells[cell])
+                break
+            for cell in self._ring(center, r, lo, hi):
+                items = cells.get(cell)
+                if items:
+                    consider(items)
+            # anything in ring r+1 is at least r units away
+            if len(best) == k and -best[0][0] <= r:
+                break
+            r += 1
+        best.sort(key=lambda b: -b[0])
+        return [(math.dist(self.point(row), query), self.summary(row)) for _, row in best]
+
+_quote_index = None
+_quote_index_lock = threading.Lock()
+# Id of the queued or running rebuild job. While it runs, deliveries are
+# also collected in _quote_pending and replayed onto the new index.
+_quote_rebuild_job = None
+_quote_pending = None
+
+def build_quote_index(archived):
+    index = QuoteIndex()
+    for v in archived:
+        index.add(v)
+    return index
+
+def start_quote_index_rebuild():
+    """
+    Starts a rebuild on the system job thread unless one is already
+    queued or running. Returns the new job id, or None.
+    """
+    global _quote_rebuild_job
+    with _quote_index_lock:
+        if _quote_rebuild_job is not None:
+            job = get_job(_quote_rebuild_job)
+            if job is not None and job["status"] in ("queued", "running"):
+                return None
+        _quote_rebuild_job = submit_job("quote_index_rebuild", rebuild_quote_index_job, system=True)
+        return _quote_rebuild_job
+
+def get_quote_index():
+    """
+    The current index. Until the first build finishes this starts one
+    in the background and raises QuoteIndexWarmingUp.
+    """
+    with _quote_index_lock:
+        index = _quote_index
+    if index is None:
+        start_quote_index_rebuild()
+        raise QuoteIndexWarmingUp()
+    return index
+
+def add_to_quote_index(vehicle):
+    """
+    Keeps the index current, including one that is being rebuilt.
+    """
+    with _quote_index_lock:
+        if _quote_pending is not None:
+            _quote_pending.append(vehicle)
+        if _quote_index is not None:
+            _quote_index.add(vehicle)
+
+@functools.lru_cache(maxsize=QUOTE_CACHE_SIZE)
+def _cached_quote(index, version, weight, length, distance, k):
+    neighbours = index.nearest(quote_point(weight, length, distance), k)
+    if not neighbours:
+        return None
+    # inverse-distance weighting, so an exact match dominates
+    weights = [1.0 / (d + 0.1) for d, _ in neighbours]
+    rates = [s["dollar_per_mile"] for _, s in neighbours]
+    estimate = sum(w * rate for w, rate in zip(weights, rates)) / sum(weights)
+    return {
+        "dollar_per_mile": round(estimate, 2),
+        "low": round(min(rates), 2),
+        "high": round(max(rates), 2),
+        "neighbours": [dict(s, similarity_distance=round(d, 3)) for d, s in neighbours],
+    }
+
+def quote_rate(weight, length, distance, k=QUOTE_DEFAULT_K):
+    """
+    Estimated $/mi for a vehicle and lane from its k most similar
+    archived deliveries, or None if the archive has nothing to go on.
+    Raises QuoteIndexWarmingUp while the index is first being built.
+    """
+    index = get_quote_index()
+    # round so near-identical requests share a cache entry
+    return _cached_quote(index, index.version, round(weight), round(length, 1), round(distance), k)
 
-def load_archived():
-    return load_json(ARCHIVED_FILE)
+# ---------------------------------------------------------------------
+# JOB: ARCHIVE EXPORT
+# ---------------------------------------------------------------------
+ARCHIVE_EXPORT_FIELDS = [
+    "depot", "driver", "make_model_year", "weight", "height", "length",
+    "distance", "dollar_per_mile", "comment", "delivered_at",
+]
+
+def export_archived_job(ctx):
+    archived = load_all_archived()
+    os.makedirs(EXPORTS_DIR, exist_ok=True)
+    path = os.path.join(EXPORTS_DIR, f"archived_{ctx.job_id}.csv")
+    ctx.output_file(path)
+    total = len(archived)
+    try:
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=ARCHIVE_EXPORT_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            for i, v in enumerate(archived):
+                writer.writerow(v)
+                if i % 500 == 0:
+                    ctx.progress(i, total)
+    except BaseException:
+        # don't leave a half-written export behind on cancel or failure
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return {"file": path, "rows": total}
 
-def save_archived(archived):
-    save_json(ARCHIVED_FILE, archived)
+# ---------------------------------------------------------------------
+# JOB: QUOTE INDEX REBUILD
+# ---------------------------------------------------------------------
+def _archive_key(v):
+    return (v.get("depot"), v.get("driver"), v.get("delivered_at"))
+
+def rebuild_quote_index_job(ctx):
+    global _quote_index, _quote_pending, _quote_rebuild_job
+    with _quote_index_lock:
+        _quote_pending = []
+        # a delivery made around now may be both in the archive and the
+        # pending log; remember those so they are only added once
+        recent_since = (datetime.now() - timedelta(minutes=1)).isoformat()
+    try:
+        index = QuoteIndex()
+        recent = set()
+        depots = list_depots()
+        # one depot's archive in memory at a time
+        for i, depot in enumerate(depots):
+            for v in load_archived(depot):
+                v.setdefault("depot", depot)
+                index.add(v)
+                if v.get("delivered_at", "") >= recent_since:
+                    recent.add(_archive_key(v))
+            ctx.progress(i + 1, len(depots))
+
+        with _quote_index_lock:
+            for v in _quote_pending:
+                if _archive_key(v) not in recent:
+                    index.add(v)
+            _quote_index = index
+            # drop entries (and references) for the old index
+            _cached_quote.cache_clear()
+    finally:
+        with _quote_index_lock:
+            _quote_pending = None
+            if _quote_rebuild_job == ctx.job_id:
+                _quote_rebuild_job = None
+    return {"rows": index.size}
 
 # ---------------------------------------------------------------------
 # MAIN PAGE HTML
 # ---------------------------------------------------------------------
-def build_main_page_html(drivers, message=None):
+def build_main_page_html(summary, message=None):
     """
-    Main page listing:
+    Main page listing, built from fleet_summary():
+      - Fleet-wide totals across all depots
       - Driver name links to driver_detail
       - Summation of $/mile for each driver's vehicles
       - Remaining Weight, Remaining Length
@@ -147,18 +1184,23 @@ def build_main_page_html(drivers, message=None):
           <a href="/add_driver">Add Driver</a>
           <a href="/archived" class="secondary">View Archived</a>
           <a href="/calculator" class="secondary">Calculator</a>
+          <a href="/quote" class="secondary">Rate Quote</a>
         </div>
 
+        <p class="fleet-totals"></p>
+
         <h2>All Drivers</h2>
         <table class="driver-table">
           <thead>
             <tr>
               <th>#</th>
+              <th>Depot</th>
               <th>Name</th>
               <th>Loaded</th>
               <th>Rem Wt</th>
               <th>Sum($/mi)</th>
               <th>Rem Len</th>
+              <th>Utilization</th>
               <th>Actions</th>
             </tr>
           </thead>
@@ -180,24 +1222,21 @@ def build_main_page_html(drivers, message=None):
         container_div = soup.find("div", {"class": "msg-placeholder"})
         container_div.insert_after(alert_div)
 
-    tbody = soup.find("tbody")
-
-    for i, d in enumerate(drivers):
-        loaded = len(d["vehicles"])
-        cap = d["vehicle_capacity"]
-
-        # Remaining Weight
-        current_weight = sum(v["weight"] for v in d["vehicles"])
-        rem_wt = d["allowed_cargo_weight"] - current_weight
+    totals = summary["totals"]
+    soup.find("p", {"class": "fleet-totals"}).string = (
+        f"{totals['depots']} depots, {totals['drivers']} drivers, "
+        f"{totals['vehicles']}/{totals['capacity']} slots loaded, "
+        f"Sum($/mi): {round(totals['dollar_per_mile'], 2)}, "
+        f"{totals['archived']} delivered"
+    )
 
-        # Sum($/mi)
-        total_dollar_mi = sum(v.get("dollar_per_mile", 0.0) for v in d["vehicles"])
+    tbody = soup.find("tbody")
 
-        # Remaining Length
-        used_length = sum(v["length"] for v in d["vehicles"]) + (loaded * d["safe_distance"])
-        rem_len = d["carrier_length_limit"] - used_length
-        if rem_len < 0:
-            rem_len = 0
+    for r in (r for s in summary["depots"] for r in s["drivers"]):
+        i, depot = r["index"], r["depot"]
+        loaded, cap = r["loaded"], r["capacity"]
+        rem_wt, total_dollar_mi, rem_len = r["rem_wt"], r["dollar_per_mile"], r["rem_len"]
+        qs = f"depot={depot}&index={i}"
 
         row = soup.new_tag("tr")
 
@@ -206,10 +1245,15 @@ def build_main_page_html(drivers, message=None):
         td_index.string = str(i)
         row.append(td_index)
 
+        # depot
+        td_depot = soup.new_tag("td")
+        td_depot.string = depot
+        row.append(td_depot)
+
         # name (link)
         td_name = soup.new_tag("td")
-        link_detail = soup.new_tag("a", href=f"/driver_detail?index={i}")
-        link_detail.string = d["name"]
+        link_detail = soup.new_tag("a", href=f"/driver_detail?{qs}")
+        link_detail.string = r["name"]
         td_name.append(link_detail)
         row.append(td_name)
 
@@ -233,21 +1277,26 @@ def build_main_page_html(drivers, message=None):
         td_remlen.string = f"{round(rem_len,2)} ft"
         row.append(td_remlen)
 
+        # utilization sparkline (slots / weight / length)
+        td_util = soup.new_tag("td")
+        td_util.append(build_sparkline(soup, utilization_points(r["name"], depot)))
+        row.append(td_util)
+
         # actions
         td_actions = soup.new_tag("td")
 
         # Edit link
-        link_edit = soup.new_tag("a", href=f"/edit_driver?index={i}", **{"class": "action-button secondary"})
+        link_edit = soup.new_tag("a", href=f"/edit_driver?{qs}", **{"class": "action-button secondary"})
         link_edit.string = "Edit"
         td_actions.append(link_edit)
 
         # Delete link
-        link_delete = soup.new_tag("a", href=f"/delete_driver?index={i}", **{"class": "action-button danger"})
+        link_delete = soup.new_tag("a", href=f"/delete_driver?{qs}", **{"class": "action-button danger"})
         link_delete.string = "Delete"
         td_actions.append(link_delete)
 
         # Add Vehicle
-        link_vehicle = soup.new_tag("a", href=f"/add_vehicle?driver_index={i}", **{"class": "action-button"})
+        link_vehicle = soup.new_tag("a", href=f"/add_vehicle?depot={depot}&driver_index={i}", **{"class": "action-button"})
         link_vehicle.string = "Add Vehicle"
         td_actions.append(link_vehicle)
 
@@ -326,10 +1375,12 @@ def build_archived_page_html(archived):
 
       <div class="container">
         <a href="/" class="button">Back to Home</a>
+        <a href="/export_archived" class="button">Export CSV</a>
         <table>
           <thead>
             <tr>
               <th>#</th>
+              <th>Depot</th>
               <th>Make/Model/Year</th>
               <th>Weight</th>
               <th>Height</th>
@@ -359,6 +1410,10 @@ def build_archived_page_html(archived):
         td_index.string = str(i)
         row.append(td_index)
 
+        td_depot = soup.new_tag("td")
+        td_depot.string = v.get("depot", "")
+        row.append(td_depot)
+
         td_mm = soup.new_tag("td")
         td_mm.string = v.get("make_model_year", "")
         row.append(td_mm)
@@ -401,8 +1456,7 @@ def build_archived_page_html(archived):
 @app.route("/")
 def home():
     msg = request.args.get("msg", "")
-    drivers = load_drivers()
-    page_html = build_main_page_html(drivers, message=msg)
+    page_html = build_main_page_html(fleet_summary(), message=msg)
     return page_html
 
 # ---------------------------------------------------------------------
@@ -410,7 +1464,7 @@ def home():
 # ---------------------------------------------------------------------
 @app.route("/archived")
 def archived_page():
-    arch = load_archived()
+    arch = load_all_archived()
     page_html = build_archived_page_html(arch)
     return page_html
 
@@ -419,7 +1473,10 @@ def archived_page():
 # ---------------------------------------------------------------------
 @app.route("/driver_detail")
 def driver_detail():
-    drivers = load_drivers()
+    depot = request.args.get("depot", DEFAULT_DEPOT)
+    if depot not in list_depots():
+        return "<h1>Invalid depot</h1><p><a href='/'>Back</a></p>"
+    drivers = load_drivers(depot)
     idx = int(request.args.get("index", "-1"))
     if idx < 0 or idx >= len(drivers):
         return "<h1>Invalid driver index</h1><p><a href='/'>Back</a></p>"
@@ -476,6 +1533,7 @@ def driver_detail():
     <body>
       <div class="container">
         <h1>Driver Detail: {driver['name']}</h1>
+        <p>Depot: {depot}</p>
         <p>Capacity: {driver['vehicle_capacity']}, Allowed Weight: {driver['allowed_total_weight']}, 
            Remaining Wt: {driver['allowed_cargo_weight'] - sum(v["weight"] for v in driver["vehicles"])} lbs</p>
         <p><strong>Sum of $/mi: {round(total_dpm,2)}</strong></p>
@@ -498,8 +1556,8 @@ def driver_detail():
     """
     for i, v in enumerate(driver["vehicles"]):
         dpm_val = v.get("dollar_per_mile", 0.0)
-        # We'll add a link: /deliver_vehicle?driver_index=xxx&veh_index=xxx
-        deliver_link = f"/deliver_vehicle?driver_index={idx}&veh_index={i}"
+        # We'll add a link: /deliver_vehicle?depot=xxx&driver_index=xxx&veh_index=xxx
+        deliver_link = f"/deliver_vehicle?depot={depot}&driver_index={idx}&veh_index={i}"
         html += f"""
           <tr>
             <td>{i}</td>
@@ -706,40 +1764,323 @@ def deliver_vehicle():
     Moved from main page to driver detail.
     This route finalizes the delivery, moves vehicle to archived_vehicles with all fields.
     """
-    drivers = load_drivers()
-    archived = load_archived()
+    depot = request.args.get("depot", DEFAULT_DEPOT)
+    if depot not in list_depots():
+        return redirect("/?msg=Invalid+depot")
     driver_index = int(request.args.get("driver_index", "-1"))
     veh_index = int(request.args.get("veh_index", "-1"))
 
-    if driver_index < 0 or driver_index >= len(drivers):
-        return redirect("/?msg=Invalid+driver+index")
-    driver = drivers[driver_index]
+    # only this depot's shard is locked; other depots keep working
+    with shard_lock(depot):
+        drivers = load_drivers(depot)
+        archived = load_archived(depot)
+
+        if driver_index < 0 or driver_index >= len(drivers):
+            return redirect("/?msg=Invalid+driver+index")
+        driver = drivers[driver_index]
+
+        if veh_index < 0 or veh_index >= len(driver["vehicles"]):
+            return redirect("/?msg=Invalid+vehicle+index")
 
-    if veh_index < 0 or veh_index >= len(driver["vehicles"]):
-        return redirect("/?msg=Invalid+vehicle+index")
+        vehicle = driver["vehicles"].pop(veh_index)
+        vehicle["delivered_at"] = datetime.now().isoformat()
+        vehicle["driver"] = driver["name"]
+        vehicle["depot"] = depot
 
-    vehicle = driver["vehicles"].pop(veh_index)
-    vehicle["delivered_at"] = datetime.now().isoformat()
+        # store ALL fields in archived
+        archived.append(vehicle)
+        save_archived(archived, depot)
+        save_drivers(drivers, depot)
+    add_to_quote_index(vehicle)
 
-    # store ALL fields in archived
-    archived.append(vehicle)
-    save_archived(archived)
-    save_drivers(drivers)
+    return redirect(f"/driver_detail?depot={depot}&index={driver_index}")
+
+# ---------------------------------------------------------------------
+# UTILIZATION API
+# ---------------------------------------------------------------------
+@app.route("/api/utilization")
+def utilization_api():
+    """
+    Utilization series for every driver. ?tier= raw | 1m | 1h | 1d
+    """
+    tier = request.args.get("tier", "raw")
+    if tier not in [name for name, _, _ in UTILIZATION_TIERS]:
+        return jsonify({"error": "Unknown tier"}), 400
+    return jsonify([
+        {"depot": depot, "index": i, "name": d["name"], "current": driver_utilization(d),
+         "series": utilization_points(d["name"], depot, tier)}
+        for depot in list_depots()
+        for i, d in enumerate(load_drivers(depot))
+    ])
+
+@app.route("/api/utilization/<depot>/<int:index>")
+def driver_utilization_api(depot, index):
+    tier = request.args.get("tier", "raw")
+    if tier not in [name for name, _, _ in UTILIZATION_TIERS]:
+        return jsonify({"error": "Unknown tier"}), 400
+    if depot not in list_depots():
+        return jsonify({"error": "Invalid depot"}), 404
+    drivers = load_drivers(depot)
+    if index < 0 or index >= len(drivers):
+        return jsonify({"error": "Invalid driver index"}), 404
+    d = drivers[index]
+    return jsonify({"depot": depot, "index": index, "name": d["name"], "current": driver_utilization(d),
+                    "series": utilization_points(d["name"], depot, tier)})
+
+@app.route("/api/fleet")
+def fleet_api():
+    return jsonify(fleet_summary())
 
-    return redirect(f"/driver_detail?index={driver_index}")
+# ---------------------------------------------------------------------
+# RATE QUOTE
+# ---------------------------------------------------------------------
+def parse_quote_args(args):
+    """
+    (weight, length, distance, k) from form/query args, or None if any
+    of the three numbers is missing or invalid.
+    """
+    try:
+        weight = float(args.get("weight", ""))
+        length = float(args.get("length", ""))
+        distance = float(args.get("distance", ""))
+        k = int(args.get("k", QUOTE_DEFAULT_K))
+    except ValueError:
+        return None
+    if not all(math.isfinite(x) for x in (weight, length, distance)):
+        return None
+    if weight <= 0 or length <= 0 or distance <= 0 or k <= 0:
+        return None
+    return weight, length, distance, min(k, 100)
+
+@app.route("/api/quote")
+def quote_api():
+    parsed = parse_quote_args(request.args)
+    if parsed is None:
+        return jsonify({"error": "weight, length and distance must be positive numbers"}), 400
+    try:
+        result = quote_rate(*parsed)
+    except QuoteIndexWarmingUp:
+        return jsonify({"error": "Quote index is warming up, try again shortly"}), 503
+    if result is None:
+        return jsonify({"error": "No archived deliveries to quote from"}), 404
+    return jsonify(dict(result, make_model_year=request.args.get("make_model_year", "")))
+
+@app.route("/quote/rebuild")
+def quote_rebuild():
+    job_id = start_quote_index_rebuild()
+    if job_id is None:
+        return redirect("/?msg=Quote+index+rebuild+already+running")
+    return redirect(f"/?msg=Quote+index+rebuild+started:+/jobs/{job_id}")
+
+@app.route("/quote", methods=["GET", "POST"])
+def quote_page():
+    form = request.form if request.method == "POST" else {}
+    mmy = escape(form.get("make_model_year", "").strip())
+    weight_str = escape(form.get("weight", "").strip())
+    length_str = escape(form.get("length", "").strip())
+    distance_str = escape(form.get("distance", "").strip())
+
+    results_html = ""
+    if request.method == "POST":
+        parsed = parse_quote_args(form)
+        try:
+            result = quote_rate(*parsed) if parsed else None
+            warming_up = False
+        except QuoteIndexWarmingUp:
+            result, warming_up = None, True
+        if parsed is None:
+            results_html = '<div class="results">Enter weight, length and distance.</div>'
+        elif warming_up:
+            results_html = '<div class="results">Quote index is warming up, try again shortly.</div>'
+        elif result is None:
+            results_html = '<div class="results">No archived deliveries to quote from.</div>'
+        else:
+            total = result["dollar_per_mile"] * parsed[2]
+            rows = "".join(
+                f"""
+                <tr>
+                  <td>{escape(s['make_model_year'])}</td>
+                  <td>{escape(s['weight'])}</td>
+                  <td>{escape(s['length'])}</td>
+                  <td>{escape(s['distance'])}</td>
+                  <td>{round(s['dollar_per_mile'],2)}</td>
+                </tr>
+                """
+                for s in result["neighbours"]
+            )
+            results_html = f"""
+            <div class="results">
+              <strong>{mmy or 'Vehicle'}: ${result['dollar_per_mile']}/mi</strong>
+              (range {result['low']} - {result['high']}), about ${round(total,2)} for {parsed[2]} mi
+            </div>
+            <h3>Similar deliveries</h3>
+            <table>
+              <thead>
+                <tr><th>Vehicle</th><th>Weight</th><th>Length</th><th>Distance</th><th>$/mi</th></tr>
+              </thead>
+              <tbody>{rows}</tbody>
+            </table>
+            """
+
+    return f"""
+    <html>
+    <head>
+      <title>Rate Quote</title>
+      <style>
+        body {{
+          font-family: 'Segoe UI', Tahoma, sans-serif;
+          background-color: #f7f9fc;
+          margin: 0; padding: 0;
+        }}
+        .container {{
+          max-width: 800px;
+          margin: 2rem auto;
+          background: #fff;
+          padding: 2rem;
+          box-shadow: 0 2px 5px rgba(0,0,0,0.1);
+        }}
+        label {{ display: block; margin: 1rem 0 0.3rem; }}
+        input {{
+          width: 100%;
+          padding: 0.5rem;
+          margin-bottom: 1rem;
+          border: 1px solid #ccc;
+          border-radius: 4px;
+        }}
+        button {{
+          background-color: #007bff;
+          color: #fff;
+          border: none;
+          padding: 0.8rem 1.2rem;
+          border-radius: 4px;
+          cursor: pointer;
+        }}
+        a.button {{
+          background-color: #6c757d;
+          margin-top: 1rem;
+          display: inline-block;
+          padding: 8px 14px;
+          color: white;
+          text-decoration: none;
+          border-radius: 4px;
+        }}
+        .results {{
+          background-color: #d4edda;
+          color: #155724;
+          padding: 10px;
+          border: 1px solid #c3e6cb;
+          border-radius: 4px;
+          margin-top: 1rem;
+        }}
+        table {{
+          width: 100%;
+          border-collapse: collapse;
+        }}
+        th, td {{
+          padding: 10px;
+          border-bottom: 1px solid #ddd;
+          text-align: left;
+        }}
+        th {{
+          background-color: #f1f1f1;
+        }}
+      </style>
+    </head>
+    <body>
+      <div class="container">
+        <h1>Rate Quote</h1>
+        <form method="POST">
+          <label>Make/Model/Year</label>
+          <input type="text" name="make_model_year" value="{mmy}" placeholder="e.g. Toyota Camry 2020">
+
+          <label>Weight (lbs)</label>
+          <input type="number" step="any" name="weight" value="{weight_str}">
+
+          <label>Length (ft)</label>
+          <input type="number" step="any" name="length" value="{length_str}">
+
+          <label>Distance (mi)</label>
+          <input type="number" step="any" name="distance" value="{distance_str}">
+
+          <button type="submit">Get Quote</button>
+        </form>
+        {results_html}
+        <p><a href="/" class="button">Back</a></p>
+      </div>
+    </body>
+    </html>
+    """
+
+# ---------------------------------------------------------------------
+# JOB ROUTES
+# ---------------------------------------------------------------------
+@app.route("/export_archived")
+def export_archived():
+    """
+    Starts the CSV export in the background and returns right away.
+    Progress is at /jobs/<id>, the file at /jobs/<id>/result.
+    """
+    try:
+        job_id = submit_job("archive_export", export_archived_job)
+    except JobQueueFull:
+        return redirect("/?msg=Too+many+jobs+queued,+try+again+later")
+    return redirect(f"/?msg=Archive+export+started:+/jobs/{job_id}")
+
+@app.route("/jobs")
+def jobs_list():
+    with _jobs_lock:
+        jobs = sorted(load_jobs().values(), key=lambda j: j["created_at"], reverse=True)
+        metrics = dict(job_metrics)
+    done = metrics["finished"] + metrics["failed"] + metrics["cancelled"]
+    metrics["avg_exec_seconds"] = round(metrics["total_exec_seconds"] / done, 3) if done else 0.0
+    return jsonify({"jobs": jobs, "metrics": metrics})
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job)
+
+@app.route("/jobs/<job_id>/result")
+def job_result(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    if job["status"] != "finished":
+        return jsonify({"error": f"Job is {job['status']}", "status": job["status"]}), 409
+    result = job["result"] or {}
+    if "file" in result and os.path.exists(result["file"]):
+        return send_file(os.path.abspath(result["file"]), as_attachment=True)
+    return jsonify(result)
+
+@app.route("/jobs/<job_id>/cancel", methods=["GET", "POST"])
+def job_cancel(job_id):
+    if get_job(job_id) is None:
+        return jsonify({"error": "Unknown job"}), 404
+    if not cancel_job(job_id):
+        return jsonify({"error": "Job already finished"}), 409
+    return jsonify(get_job(job_id))
 
 # ---------------------------------------------------------------------
 # STARTUP
 # ---------------------------------------------------------------------
 def ensure_data_files():
     os.makedirs("data", exist_ok=True)
-    if not os.path.exists(DRIVERS_FILE):
-        with open(DRIVERS_FILE, "w") as f:
-            f.write("[]")
-    if not os.path.exists(ARCHIVED_FILE):
-        with open(ARCHIVED_FILE, "w") as f:
-            f.write("[]")
+    ensure_depot(DEFAULT_DEPOT)
+    migrate_legacy_files()
+    if not os.path.exists(JOBS_FILE):
+        with open(JOBS_FILE, "w") as f:
+            f.write("{}")
+    mark_interrupted_jobs()
+    # seed the series so every driver has a starting point
+    for depot in list_depots():
+        record_utilization(load_drivers(depot), depot)
 
 if __name__ == "__main__":
     ensure_data_files()
+    # debug mode re-runs this file in a child process that serves the
+    # requests; only that one should build the index
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_quote_index_rebuild()
     app.run(debug=True, port=5000)
\ No newline at end of file
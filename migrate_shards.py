@@ -0,0 +1,71 @@
+"""
+Depot shard maintenance. Run with the web app stopped, since the shard
+locks only guard writers inside the app process.
+
+  python migrate_shards.py list
+  python migrate_shards.py import
+  python migrate_shards.py move "Driver Name" FROM_DEPOT TO_DEPOT
+  python migrate_shards.py apply
+
+"apply" moves drivers whose "depot" field was edited by hand into that
+depot's shard. Use "move" to reassign a single driver.
+"""
+import sys
+
+from main import (
+    list_depots, load_drivers, load_archived, ensure_depot, valid_depot_name,
+    migrate_legacy_files, move_driver, apply_depot_assignments,
+)
+
+def cmd_list():
+    for depot in list_depots():
+        drivers = load_drivers(depot)
+        vehicles = sum(len(d["vehicles"]) for d in drivers)
+        print(f"{depot}: {len(drivers)} drivers, {vehicles} vehicles, {len(load_archived(depot))} archived")
+
+def cmd_import():
+    moved = migrate_legacy_files()
+    print(f"Imported {moved} drivers from the legacy data files")
+
+def cmd_move(name, src_depot, dst_depot):
+    if not valid_depot_name(dst_depot):
+        print(f"Invalid depot name: {dst_depot}")
+        return 1
+    if src_depot not in list_depots():
+        print(f"No such depot: {src_depot}")
+        return 1
+    if src_depot == dst_depot:
+        print(f"{name} is already in {dst_depot}")
+        return 1
+    ensure_depot(dst_depot)
+    if not move_driver(name, src_depot, dst_depot):
+        print(f"No driver named {name!r} in {src_depot}")
+        return 1
+    print(f"Moved {name} from {src_depot} to {dst_depot}")
+
+def cmd_apply():
+    moves, rejected = apply_depot_assignments()
+    for name, src_depot, dst_depot in moves:
+        print(f"Moved {name} from {src_depot} to {dst_depot}")
+    for name, src_depot, dst_depot in rejected:
+        print(f"Skipped {name} in {src_depot}: invalid depot name {dst_depot!r}")
+    print(f"{len(moves)} drivers moved, {len(rejected)} skipped")
+    return 1 if rejected else 0
+
+COMMANDS = {
+    "list": (cmd_list, 0),
+    "import": (cmd_import, 0),
+    "move": (cmd_move, 3),
+    "apply": (cmd_apply, 0),
+}
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        print(__doc__)
+        sys.exit(1)
+    func, nargs = COMMANDS[sys.argv[1]]
+    args = sys.argv[2:]
+    if len(args) != nargs:
+        print(__doc__)
+        sys.exit(1)
+    sys.exit(func(*args) or 0)